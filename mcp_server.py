@@ -1,12 +1,22 @@
 import os
+import asyncio
 import warnings
 import platform
 import sys
-import requests
+import re
+import threading
+import time
+import httpx
+import orjson
 
-from typing import List, Optional, Dict, Any
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Dict, Any, Tuple
+from urllib.parse import urlsplit
+from cachetools import TLRUCache
 from fastmcp import FastMCP
-from supabase import create_client, Client
+from supabase import create_client, Client, ClientOptions
+from postgrest.types import ReturnMethod
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -19,8 +29,20 @@ SUPABASE_KEY = os.getenv("PUBLIC_SUPABASE_PUBLISHABLE_DEFAULT_KEY")
 if not SUPABASE_URL or not SUPABASE_KEY:
     print("Warning: SUPABASE_URL and SUPABASE_KEY (or PUBLIC variants) environment variables must be set.")
 
+# Small, bounded keep-alive pool shared by all Supabase calls so concurrent
+# tool invocations reuse connections instead of opening new ones. Closed by the
+# server lifespan on shutdown.
+_supabase_http = httpx.Client(
+    timeout=httpx.Timeout(10.0, connect=2.0),
+    limits=httpx.Limits(max_keepalive_connections=5, max_connections=10, keepalive_expiry=30)
+)
+
 try:
-    supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY) if SUPABASE_URL and SUPABASE_KEY else None
+    supabase: Client = create_client(
+        SUPABASE_URL,
+        SUPABASE_KEY,
+        options=ClientOptions(httpx_client=_supabase_http)
+    ) if SUPABASE_URL and SUPABASE_KEY else None
 except Exception as e:
     print(f"Failed to initialize Supabase client: {e}")
     supabase = None
@@ -28,8 +50,119 @@ except Exception as e:
 # GET RAPIDAPI_KEY from environment
 RAPIDAPI_KEY = os.getenv("RAPIDAPI_KEY")
 
-# Create an MCP server
-mcp = FastMCP("Surelook Holmes")
+# RapidAPI LinkedIn endpoint; built once at import since only linkedin_url varies per call
+LINKEDIN_API_HOST = "fresh-linkedin-profile-data.p.rapidapi.com"
+LINKEDIN_API_URL = f"https://{LINKEDIN_API_HOST}/enrich-lead"
+LINKEDIN_HEADERS = {
+    "x-rapidapi-host": LINKEDIN_API_HOST,
+    "x-rapidapi-key": RAPIDAPI_KEY or ""
+}
+LINKEDIN_QUERYSTRING = {
+    "include_skills": "false",
+    "include_certifications": "false",
+    "include_publications": "false",
+    "include_honors": "false",
+    "include_volunteers": "false",
+    "include_projects": "false",
+    "include_patents": "false",
+    "include_courses": "false",
+    "include_organizations": "false",
+    "include_profile_status": "false",
+    "include_company_public_url": "false"
+}
+
+# Shared async HTTP client so concurrent tool calls reuse keep-alive connections.
+# Closed by the server lifespan on shutdown.
+_http = httpx.AsyncClient(
+    http2=True,
+    timeout=10.0,
+    limits=httpx.Limits(max_keepalive_connections=20, max_connections=50),
+    headers=LINKEDIN_HEADERS
+)
+
+# How long a LinkedIn lookup stays fresh, in seconds
+LINKEDIN_CACHE_TTL = 86400
+
+# In-process cache of parsed LinkedIn lookups, keyed by normalized profile URL.
+# Backed by the Supabase `linkedin_cache` table so lookups survive restarts.
+# Entries are (expires_at, result) pairs so rows loaded from the table only
+# live for what is left of their TTL.
+_linkedin_cache: TLRUCache = TLRUCache(maxsize=1024, ttu=lambda _key, entry, _now: entry[0], timer=time.time)
+_linkedin_cache_lock = threading.Lock()
+
+def _normalize_linkedin_url(url: str) -> str:
+    """Normalize a LinkedIn profile URL for use as a cache key."""
+    parts = urlsplit(url.strip() if "://" in url else f"https://{url.strip()}")
+    host = parts.netloc.lower()
+    if host.startswith("www."):
+        host = host[len("www."):]
+    return f"https://{host}{parts.path.rstrip('/')}"
+
+def _parse_timestamp(value: str) -> datetime:
+    """Parse a Postgres timestamptz; pads fractional seconds to 6 digits for Python 3.10's fromisoformat."""
+    value = re.sub(r"\.(\d+)", lambda m: "." + m.group(1)[:6].ljust(6, "0"), value.replace("Z", "+00:00"))
+    return datetime.fromisoformat(value)
+
+def _load_linkedin_cache_row(key: str) -> Optional[Tuple[float, Dict[str, Any]]]:
+    """Return (expires_at, result) for `key` from Supabase if it is still fresh."""
+    if not supabase:
+        return None
+    # Freshness is checked by Postgres; scraped_at only sets the in-process expiry
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=LINKEDIN_CACHE_TTL)
+    try:
+        response = supabase.table("linkedin_cache").select("full_name, current_company, about, scraped_at").eq("normalized_url", key).gte("scraped_at", cutoff.strftime("%Y-%m-%dT%H:%M:%SZ")).maybe_single().execute()
+    except Exception as e:
+        print(f"Failed to read linkedin_cache: {e}")
+        return None
+    row = response.data if response else None
+    if not row:
+        return None
+    try:
+        expires_at = _parse_timestamp(row["scraped_at"]).timestamp() + LINKEDIN_CACHE_TTL
+    except (KeyError, TypeError, ValueError):
+        # Unknown age: still serve the row, but don't keep it in the in-process cache
+        expires_at = time.time()
+    return expires_at, {
+        "name": row.get("full_name"),
+        "company": row.get("current_company"),
+        "about": row.get("about")
+    }
+
+def _store_linkedin_cache_row(key: str, result: Dict[str, Any], profile: Dict[str, Any]) -> None:
+    """Upsert a lookup into the Supabase `linkedin_cache` table."""
+    if not supabase:
+        return
+    try:
+        supabase.table("linkedin_cache").upsert({
+            "normalized_url": key,
+            "full_name": result["name"],
+            "current_company": result["company"],
+            "about": result["about"],
+            "raw": profile,
+            "scraped_at": datetime.now(timezone.utc).isoformat()
+        }, returning=ReturnMethod.minimal).execute()
+    except Exception as e:
+        print(f"Failed to write linkedin_cache: {e}")
+
+# Event types accepted by the events table; checked locally to skip a round-trip on bad input.
+# NOTES is the type get_notes reads.
+EVENT_TYPES = frozenset({"VISUAL_OBSERVATION", "CONVERSATION_NOTE", "AGENT_WHISPER", "NOTES"})
+
+# Default column projections for list-style reads; tools accept `fields` to ask for more
+EVENT_FIELDS = "id,type,content,created_at,session_id,related_identity_id"
+IDENTITY_FIELDS = "id,name,relationship_status,linkedin_url"
+
+@asynccontextmanager
+async def lifespan(server: FastMCP):
+    """Close the shared HTTP clients when the server shuts down."""
+    try:
+        yield
+    finally:
+        await _http.aclose()
+        _supabase_http.close()
+
+# Create an MCP server. The lifespan is entered once per server, not per session.
+mcp = FastMCP("Surelook Holmes", lifespan=lifespan)
 
 @mcp.tool()
 def get_identity(identity_id: str) -> Dict[str, Any]:
@@ -37,7 +170,9 @@ def get_identity(identity_id: str) -> Dict[str, Any]:
     if not supabase:
         return {"error": "Supabase client not initialized"}
     
-    response = supabase.table("identities").select("*").eq("id", identity_id).single().execute()
+    response = supabase.table("identities").select("*").eq("id", identity_id).maybe_single().execute()
+    if not response or response.data is None:
+        return {"error": "Identity not found"}
     return response.data
 
 @mcp.tool()
@@ -61,15 +196,13 @@ def update_identity(
     if not supabase:
         return {"error": "Supabase client not initialized"}
     
-    updates = {}
-    if name is not None:
-        updates["name"] = name
-    if relationship_status is not None:
-        updates["relationship_status"] = relationship_status
-    if linkedin_url is not None:
-        updates["linkedin_url"] = linkedin_url
-    if metadata is not None:
-        updates["metadata"] = metadata
+    candidates = (
+        ("name", name),
+        ("relationship_status", relationship_status),
+        ("linkedin_url", linkedin_url),
+        ("metadata", metadata)
+    )
+    updates = {field: value for field, value in candidates if value is not None}
         
     if not updates:
         return {"error": "No updates provided"}
@@ -78,13 +211,39 @@ def update_identity(
     return response.data[0] if response.data else {}
 
 @mcp.tool()
-def get_events(session_id: str, limit: int = 50) -> List[Dict[str, Any]]:
-    """Get events associated with a specific session ID."""
+def get_events(
+    session_id: str,
+    limit: int = 50,
+    fields: Optional[str] = None,
+    after: Optional[Dict[str, str]] = None
+) -> Dict[str, Any]:
+    """
+    Get events associated with a specific session ID, oldest first, one page at a time.
+    
+    Args:
+        session_id: The UUID of the session.
+        limit: Maximum number of events to return.
+        fields: Comma-separated columns to return (optional, defaults to the common event fields; use "*" for all). Include created_at and id to get a next_after cursor.
+        after: Cursor {"created_at": ..., "id": ...} (optional). Pass the previous page's next_after to fetch the next page.
+    
+    Returns:
+        {"items": [...], "next_after": {"created_at", "id"} of the last item, or None when there is no cursor}.
+    """
     if not supabase:
-        return [{"error": "Supabase client not initialized"}]
+        return {"error": "Supabase client not initialized"}
     
-    response = supabase.table("events").select("*").eq("session_id", session_id).order("created_at").limit(limit).execute()
-    return response.data
+    query = supabase.table("events").select(fields or EVENT_FIELDS).eq("session_id", session_id)
+    if after:
+        if not after.get("created_at") or not after.get("id"):
+            return {"error": "Cursor 'after' needs both 'created_at' and 'id'"}
+        # Rows inserted together (e.g. by create_events) share created_at, so break ties on id
+        created_at, event_id = after["created_at"], after["id"]
+        query = query.or_(f'created_at.gt."{created_at}",and(created_at.eq."{created_at}",id.gt."{event_id}")')
+    response = query.order("created_at").order("id").limit(limit).execute()
+    rows = response.data
+    last = rows[-1] if rows else {}
+    next_after = {"created_at": last["created_at"], "id": last["id"]} if last.get("created_at") and last.get("id") else None
+    return {"items": rows, "next_after": next_after}
 
 @mcp.tool()
 def create_event(
@@ -97,11 +256,14 @@ def create_event(
     Create a new event.
     
     Args:
-        type: Must be one of 'VISUAL_OBSERVATION', 'CONVERSATION_NOTE', 'AGENT_WHISPER'.
+        type: Must be one of 'VISUAL_OBSERVATION', 'CONVERSATION_NOTE', 'AGENT_WHISPER', 'NOTES'.
         content: The content of the event.
         session_id: Optional UUID of the associated session.
         related_identity_id: Optional UUID of the related identity.
     """
+    if type not in EVENT_TYPES:
+        return {"error": f"Invalid event type '{type}'"}
+    
     if not supabase:
         return {"error": "Supabase client not initialized"}
     
@@ -117,57 +279,128 @@ def create_event(
     response = supabase.table("events").insert(data).execute()
     return response.data[0] if response.data else {}
 
+@mcp.tool()
+def create_events(items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Create several events in a single request.
+    
+    Args:
+        items: Events to create. Each needs 'type' and 'content' and may include 'session_id' and 'related_identity_id' (same meaning as in create_event). Other keys are ignored.
+    """
+    if not supabase:
+        return [{"error": "Supabase client not initialized"}]
+    
+    if not items:
+        return [{"error": "No events provided"}]
+    
+    rows = []
+    for i, item in enumerate(items):
+        if item.get("type") is None or item.get("content") is None:
+            return [{"error": f"Event {i} is missing 'type' or 'content'"}]
+        if item["type"] not in EVENT_TYPES:
+            return [{"error": f"Event {i} has invalid event type '{item['type']}'"}]
+        row = {"type": item["type"], "content": item["content"]}
+        for field in ("session_id", "related_identity_id"):
+            if item.get(field):
+                row[field] = item[field]
+        rows.append(row)
+    
+    response = supabase.table("events").insert(rows).execute()
+    return response.data
+
 
 @mcp.tool()
-def get_notes(identity_id: str, limit: int = 50) -> List[Dict[str, Any]]:
+def get_notes(identity_id: str, limit: int = 50, fields: Optional[str] = None) -> List[Dict[str, Any]]:
     """
-    Get conversation notes (events with type 'CONVERSATION_NOTE') for a specific identity.
+    Get conversation notes (events with type 'NOTES') for a specific identity, newest first.
     
     Args:
         identity_id: The UUID of the identity.
+        fields: Comma-separated columns to return (optional, defaults to the common event fields; use "*" for all).
     """
     if not supabase:
         return [{"error": "Supabase client not initialized"}]
     
-    response = supabase.table("events").select("*").eq("related_identity_id", identity_id).eq("type", "NOTES").order("created_at", desc=True).limit(limit).execute()
+    # get_notes() is backed by a partial index on NOTES events (see supabase/migrations)
+    response = supabase.rpc("get_notes", {"p_identity": identity_id, "p_limit": limit}).select(fields or EVENT_FIELDS).execute()
     return response.data
 
 @mcp.tool()
-def who_is_this(linkedin_url: str) -> Dict[str, Any]:
+def get_identity_with_notes(identity_id: str, limit: int = 50) -> Dict[str, Any]:
+    """
+    Get an identity together with its conversation notes in a single request.
+    
+    Args:
+        identity_id: The UUID of the identity.
+        limit: Maximum number of notes to return, newest first.
+    """
+    if not supabase:
+        return {"error": "Supabase client not initialized"}
+    
+    response = (
+        supabase.table("identities")
+        .select(f"*, events({EVENT_FIELDS})")
+        .eq("id", identity_id)
+        .eq("events.type", "NOTES")
+        .order("created_at", desc=True, foreign_table="events")
+        .limit(limit, foreign_table="events")
+        .maybe_single()
+        .execute()
+    )
+    if not response or response.data is None:
+        return {"error": "Identity not found"}
+    identity = dict(response.data)
+    notes = identity.pop("events", [])
+    return {"identity": identity, "notes": notes}
+
+@mcp.tool()
+async def get_dashboard(limit: int = 20, identity_fields: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Get the most recent sessions and identities in one call.
+    
+    Args:
+        limit: Maximum number of rows to return for each list.
+        identity_fields: Comma-separated identity columns to return (optional, defaults to the display fields; use "*" for all).
+    """
+    if not supabase:
+        return {"error": "Supabase client not initialized"}
+    
+    # Independent queries, so run them concurrently on the shared client pool
+    sessions, identities = await asyncio.gather(
+        asyncio.to_thread(supabase.table("sessions").select("*").order("created_at", desc=True).limit(limit).execute),
+        asyncio.to_thread(supabase.table("identities").select(identity_fields or IDENTITY_FIELDS).limit(limit).execute)
+    )
+    return {"sessions": sessions.data, "identities": identities.data}
+
+@mcp.tool()
+async def who_is_this(linkedin_url: str) -> Dict[str, Any]:
     """
     Identify a person from their LinkedIn URL and get their latest post.
     
     Args:
         linkedin_url: The full LinkedIn profile URL.
     """
+    key = _normalize_linkedin_url(linkedin_url)
+    with _linkedin_cache_lock:
+        cached = _linkedin_cache.get(key)
+    if cached is not None:
+        return cached[1]
+
+    cached = await asyncio.to_thread(_load_linkedin_cache_row, key)
+    if cached is not None:
+        with _linkedin_cache_lock:
+            _linkedin_cache[key] = cached
+        return cached[1]
+
     if not RAPIDAPI_KEY:
         return {"error": "RAPIDAPI_KEY not set in environment"}
 
-    url = "https://fresh-linkedin-profile-data.p.rapidapi.com/enrich-lead"
-    querystring = {
-        "linkedin_url": linkedin_url,
-        "include_skills": "false",
-        "include_certifications": "false", 
-        "include_publications": "false",
-        "include_honors": "false",
-        "include_volunteers": "false",
-        "include_projects": "false",
-        "include_patents": "false",
-        "include_courses": "false",
-        "include_organizations": "false",
-        "include_profile_status": "false",
-        "include_company_public_url": "false"
-    }
-
-    headers = {
-        "x-rapidapi-host": "fresh-linkedin-profile-data.p.rapidapi.com",
-        "x-rapidapi-key": RAPIDAPI_KEY
-    }
+    querystring = {"linkedin_url": linkedin_url, **LINKEDIN_QUERYSTRING}
 
     try:
-        response = requests.get(url, headers=headers, params=querystring)
+        response = await _http.get(LINKEDIN_API_URL, params=querystring)
         response.raise_for_status()
-        data = response.json()
+        data = orjson.loads(response.content)
         
         # Check if wrapped in 'data' field (as seen in sample)
         profile = data.get("data", data)
@@ -180,42 +413,63 @@ def who_is_this(linkedin_url: str) -> Dict[str, Any]:
         current_company = "Unknown"
         experiences = profile.get("experiences", [])
         if experiences and isinstance(experiences, list):
-            # Sort by start date if possible, or just find first current
-            # Sample has is_current boolean
-            current_role = next((exp for exp in experiences if exp.get("is_current")), None)
-            if not current_role and experiences:
-                # If no current, take the first one (most recent usually)
-                current_role = experiences[0]
+            # Find first current role (sample has is_current boolean) in a single
+            # pass, remembering the first one (most recent usually) as fallback
+            current_role = None
+            first_role = None
+            for exp in experiences:
+                if first_role is None:
+                    first_role = exp
+                if exp.get("is_current"):
+                    current_role = exp
+                    break
+            current_role = current_role or first_role
             
             if current_role:
                 comp = current_role.get("company", "")
                 title = current_role.get("title", "")
                 current_company = f"{title} at {comp}" if title and comp else comp or title
             
-        return {
+        result = {
             "name": name,
             "company": current_company,
             "about": profile.get("about") # Extra context often helpful
         }
+        with _linkedin_cache_lock:
+            _linkedin_cache[key] = (time.time() + LINKEDIN_CACHE_TTL, result)
+        await asyncio.to_thread(_store_linkedin_cache_row, key, result, profile)
+        return result
 
     except Exception as e:
         return {"error": f"Failed to fetch LinkedIn data: {str(e)}"}
 
 
-@mcp.resource("system://info")
-def system_info() -> str:
-   """
-   Returns basic system information including Python version and platform.
-   """
-   return f"""
+# Platform and interpreter don't change while the process runs, so build once
+_SYSTEM_INFO = f"""
    System Information:
    ------------------
    Platform: {platform.system()} {platform.release()}
    Python Version: {sys.version}
    """
 
+@mcp.resource("system://info")
+def system_info() -> str:
+   """
+   Returns basic system information including Python version and platform.
+   """
+   return _SYSTEM_INFO
+
 
 if __name__ == "__main__":
+    # Use uvloop's libuv-based event loop when available (not supported on Windows)
+    if platform.system() != "Windows":
+        try:
+            import uvloop
+            # uvloop.install() is deprecated on Python 3.12+; set the policy directly
+            asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+        except ImportError:
+            pass
+
     # Run the server with Streamable-HTTP transport (streamable-http)
     print("Starting Surelook Holmes MCP server on Streamable-HTTP transport...")
     mcp.run(transport="streamable-http")
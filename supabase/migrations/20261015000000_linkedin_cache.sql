@@ -0,0 +1,9 @@
+-- Persistent cache of RapidAPI LinkedIn lookups used by the who_is_this tool.
+create table if not exists public.linkedin_cache (
+    normalized_url text primary key,
+    full_name text,
+    current_company text,
+    about text,
+    raw jsonb,
+    scraped_at timestamptz not null default now()
+);
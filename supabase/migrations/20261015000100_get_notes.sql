@@ -0,0 +1,19 @@
+-- Notes lookups filter on a single event type, so a partial index keeps them
+-- to a short range scan regardless of how many other events exist.
+create index if not exists events_notes_by_identity
+    on public.events (related_identity_id, created_at desc)
+    where type = 'NOTES';
+
+-- Newest notes for an identity; called by the get_notes tool via RPC.
+create or replace function public.get_notes(p_identity uuid, p_limit int default 50)
+returns setof public.events
+language sql
+stable
+as $$
+    select *
+    from public.events
+    where related_identity_id = p_identity
+      and type = 'NOTES'
+    order by created_at desc
+    limit p_limit
+$$;
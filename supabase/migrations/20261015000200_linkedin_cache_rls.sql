@@ -0,0 +1,25 @@
+-- Lock down linkedin_cache. The MCP server connects with the publishable key,
+-- i.e. as the anon role, so that is the only role given access, and only to
+-- what who_is_this needs: the summary columns (not the scraped `raw` payload)
+-- for reads, plus insert/update for its upserts.
+alter table public.linkedin_cache enable row level security;
+
+revoke all on public.linkedin_cache from anon, authenticated;
+grant select (normalized_url, full_name, current_company, about, scraped_at) on public.linkedin_cache to anon;
+grant insert, update on public.linkedin_cache to anon;
+
+create policy "linkedin_cache anon read"
+    on public.linkedin_cache for select
+    to anon
+    using (true);
+
+create policy "linkedin_cache anon insert"
+    on public.linkedin_cache for insert
+    to anon
+    with check (true);
+
+create policy "linkedin_cache anon update"
+    on public.linkedin_cache for update
+    to anon
+    using (true)
+    with check (true);